@@ -9,7 +9,14 @@ WHAT THIS DOES
 - Ensures each sheet has "Title" and "Image" headers.
 - For each row without an Image, searches Bing Images using the Title
   (plus optional Brand/Region), finds the first *live* image URL, and writes it.
-- Saves a new workbook with the Image column filled.
+- Rows that share the same query are searched only once. The unique queries
+  are split into shards of SHARD_ROWS and handed to WORKERS processes; inside
+  each process they are searched concurrently (CONCURRENCY) over one shared
+  HTTP session. Results are sent back to the main process one by one as
+  they are found.
+- Saves a new workbook with the Image column filled (cell values only;
+  formatting from the input workbook is not copied). Progress is saved every
+  SAVE_EVERY filled rows; re-running resumes from the saved output.
 
 NO API KEYS NEEDED (uses Bing web results).
 
@@ -23,7 +30,7 @@ REQUIREMENTS
 1) Python 3.12 and a virtual environment (recommended):
    python3 -m venv ~/woo-import-images/.venv
    source ~/woo-import-images/.venv/bin/activate
-   pip install openpyxl requests beautifulsoup4 lxml
+   pip install openpyxl python-calamine aiohttp aiohttp-client-cache[sqlite] aiolimiter selectolax orjson
 
 2) Put this script next to your workbook:
    products_for_auto_images_ALL_SHEETS.xlsx
@@ -39,23 +46,44 @@ TUNING
 ------
 - OPTIONAL_QUERY_COLUMNS: add/remove columns to enrich the query.
 - ALLOWED_DOMAINS: set to [] to allow any site; or e.g. ["pixabay.com","pexels.com"].
-- DELAY_BETWEEN_QUERIES: throttle to be polite.
+- HOST_RATE_LIMIT / HOST_RATE_PERIOD: per-host request budget to be polite
+  (shared by all worker processes together).
+- WORKERS / SHARD_ROWS: worker processes and queries per shard. Each shard
+  gets its own HTTP session, so keep SHARD_ROWS well above CONCURRENCY.
+- CONCURRENCY: how many rows are searched at the same time (per worker).
+- CONNECTIONS_LIMIT / CONNECTIONS_PER_HOST: size of the HTTP connection pool.
+- HTTP_CACHE / HTTP_CACHE_TTL: on-disk cache of searches and HEAD checks, so a
+  re-run does not hit the network again for the same URLs.
 """
 
 import os
-import time
-import json
+import re
+import queue
+import asyncio
 import urllib.parse
-from typing import Optional, Dict, List
-import requests
-from bs4 import BeautifulSoup
-from openpyxl import load_workbook
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from itertools import chain, islice
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional, Dict, Iterable, Iterator, List, Tuple
+import aiohttp
+import orjson
+from aiolimiter import AsyncLimiter
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+from selectolax.lexbor import LexborHTMLParser
+from openpyxl import Workbook
+from python_calamine import CalamineWorkbook
 
 # ====================== USER CONFIG (EDIT THESE) ======================
 
 INPUT_XLSX  = "products_for_auto_images_ALL_SHEETS.xlsx"
 OUTPUT_XLSX = "products_with_images_ALL_SHEETS_BING.xlsx"
 
+# Progress is saved to OUTPUT_XLSX after every SAVE_EVERY filled rows. If
+# OUTPUT_XLSX already exists when the script starts, it is read instead of
+# INPUT_XLSX, so a re-run only searches the rows that are still empty.
+SAVE_EVERY = 50
+
 TITLE_HEADER = "Title"     # main query source
 IMAGE_HEADER = "Image"     # where to write the found URL
 
@@ -68,13 +96,43 @@ OPTIONAL_QUERY_COLUMNS = ["Brand", "Region"]
 ALLOWED_DOMAINS: List[str] = []
 
 REQUEST_TIMEOUT = 20           # seconds for HTTP requests
-DELAY_BETWEEN_QUERIES = 0.60   # seconds; be polite
+HOST_RATE_LIMIT = 5            # search requests per host ...
+HOST_RATE_PERIOD = 1.0         # ... per this many seconds; be polite
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
     "Chrome/124.0 Safari/537.36"
 )
 
+# Worker processes, and how many unique queries go into each shard of work.
+# Each shard is searched over one HTTP session; results stream back as they
+# are found, so checkpoints do not depend on the shard size.
+WORKERS = os.cpu_count() or 1
+SHARD_ROWS = 200
+
+# How many rows are searched at the same time, and how big the connection pool is.
+# These limits apply to each worker process.
+CONCURRENCY = 64
+CONNECTIONS_LIMIT = 128
+CONNECTIONS_PER_HOST = 16
+KEEPALIVE_TIMEOUT = 60         # seconds an idle connection is kept for reuse
+DNS_CACHE_TTL = 300            # seconds a resolved host name is reused
+
+# Candidate image URLs HEAD-checked at the same time for one row
+HEAD_BATCH = 8
+
+# Retries for search requests that fail with a connection error or one of
+# RETRY_STATUSES; waits RETRY_BACKOFF * 2**n seconds before retry n+1
+# (or as long as a 429 response's Retry-After header asks).
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# On-disk cache for search pages and HEAD checks (SQLite file next to the script).
+# Keys include the full URL and query params. Delete the file to start fresh.
+HTTP_CACHE = ".woo_img_cache"
+HTTP_CACHE_TTL = 86400         # seconds (1 day)
+
 # Try two pages of Bing Images if needed (first indices for page 1 and 2)
 BING_PAGES_FIRST_PARAMS = [1, 11]   # 1..10, then 11..20
 
@@ -82,16 +140,101 @@ BING_PAGES_FIRST_PARAMS = [1, 11]   # 1..10, then 11..20
 
 HEADERS = {"User-Agent": USER_AGENT}
 
+# "murl":"<url>" inside a Bing 'm' attribute that is not valid JSON
+MURL_RE = re.compile(r'"murl":"([^"]+)"')
+
+
+def make_host_limiters(workers: int) -> Dict[str, AsyncLimiter]:
+    """
+    One rate limiter per host (created on first use) for a single event loop.
+    The HOST_RATE_LIMIT budget is split between the `workers` processes, so
+    all of them together stay within it. Requests are spaced out evenly: as a
+    leaky bucket, AsyncLimiter(n, period) would let a burst of n through first.
+    """
+    interval = HOST_RATE_PERIOD * workers / HOST_RATE_LIMIT
+    return defaultdict(lambda: AsyncLimiter(1, interval))
+
+
+async def cached_text(session: CachedSession, url: str, params: Optional[dict] = None) -> Optional[str]:
+    """Body of a still-valid cached GET response for `url` + `params`, or None if not cached."""
+    key = session.cache.create_key("GET", url, params=params)
+    response = await session.cache.get_response(key)
+    return None if response is None else await response.text()
+
 
-def head_ok(url: str, timeout: int = 10) -> bool:
+async def http_get(session: aiohttp.ClientSession, limiters: Dict[str, AsyncLimiter],
+                   url: str, params: Optional[dict] = None) -> Optional[str]:
+    """
+    GET `url` on the shared session and return the body text, or None on failure.
+    Responses from the on-disk cache are returned straight away; only real
+    network requests first take a slot from their host's limiter in `limiters`.
+    Connection errors and RETRY_STATUSES are retried with exponential backoff
+    (honouring Retry-After); other HTTP errors give up straight away.
+    """
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    # A cached answer costs no network request, so it costs no rate-limit slot
+    text = await cached_text(session, url, params)
+    if text is not None:
+        return text
+
+    limiter = limiters[urllib.parse.urlparse(url).netloc.lower()]
+    delay = 0.0
+    for attempt in range(RETRY_TOTAL + 1):
+        if attempt:
+            await asyncio.sleep(delay)
+        delay = RETRY_BACKOFF * 2 ** attempt
+        try:
+            async with limiter:
+                async with session.get(url, params=params, timeout=timeout) as r:
+                    if r.status in RETRY_STATUSES:
+                        retry_after = r.headers.get("Retry-After", "")
+                        if r.status == 429 and retry_after.isdigit():
+                            delay = max(delay, float(retry_after))
+                        continue
+                    r.raise_for_status()
+                    return await r.text()
+        except aiohttp.ClientResponseError:
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            continue
+    return None
+
+
+async def head_ok(session: aiohttp.ClientSession, url: str, timeout: int = 10) -> bool:
     """Return True if the URL responds with 2xx/3xx (avoid dead links)."""
     try:
-        r = requests.head(url, timeout=timeout, allow_redirects=True)
-        return 200 <= r.status_code < 400
+        async with session.head(url, timeout=aiohttp.ClientTimeout(total=timeout),
+                                allow_redirects=True) as r:
+            return 200 <= r.status < 400
     except Exception:
         return False
 
 
+async def first_live_url(session: aiohttp.ClientSession, urls: Iterable[str]) -> Optional[str]:
+    """
+    HEAD-check candidates in batches of HEAD_BATCH and return the first URL
+    that answers OK, in completion order. Unfinished probes are cancelled.
+    `urls` is consumed lazily, one batch at a time.
+    """
+    async def probe(url: str) -> Optional[str]:
+        return url if await head_ok(session, url, timeout=10) else None
+
+    it = iter(urls)
+    while True:
+        batch = list(islice(it, HEAD_BATCH))
+        if not batch:
+            return None
+        tasks = [asyncio.ensure_future(probe(u)) for u in batch]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                url = await fut
+                if url:
+                    return url
+        finally:
+            for t in tasks:
+                t.cancel()
+
+
 def domain_is_allowed(url: str) -> bool:
     """If ALLOWED_DOMAINS is set, only accept URLs from those domains."""
     if not ALLOWED_DOMAINS:
@@ -106,29 +249,23 @@ def domain_is_allowed(url: str) -> bool:
 
 def dedupe_words(text: str) -> str:
     """Remove duplicate words while preserving order (case-insensitive)."""
-    seen = set()
-    out = []
+    seen: Dict[str, str] = {}
     for w in text.split():
-        wl = w.lower()
-        if wl in seen:
-            continue
-        seen.add(wl)
-        out.append(w)
-    return " ".join(out)
+        seen.setdefault(w.lower(), w)
+    return " ".join(seen.values())
 
 
-def build_query(base_title: str, ws, row_idx: int, col_index_by_name: Dict[str, int]) -> str:
+def build_query(base_title: str, row_values: tuple, opt_idx: List[int]) -> str:
     """
     Build a richer query: Title + optional Brand/Region (if present),
     then de-duplicate to avoid repeated words like "India India".
+    `opt_idx` holds the 1-based columns of OPTIONAL_QUERY_COLUMNS in this sheet.
     """
     bits = [str(base_title).strip()]
-    for col_name in OPTIONAL_QUERY_COLUMNS:
-        idx = col_index_by_name.get(col_name)
-        if idx:
-            val = ws.cell(row=row_idx, column=idx).value
-            if val and str(val).strip():
-                bits.append(str(val).strip())
+    for idx in opt_idx:
+        val = row_values[idx - 1]
+        if val and str(val).strip():
+            bits.append(str(val).strip())
 
     # You can bias results by adding generic terms:
     # bits.append("gift card")  # Uncomment if it helps your data set.
@@ -136,165 +273,324 @@ def build_query(base_title: str, ws, row_idx: int, col_index_by_name: Dict[str,
     return dedupe_words(" ".join(bits))
 
 
-def parse_bing_image_results(html: str) -> List[str]:
+def iter_bing_candidates(html: str) -> Iterator[Tuple[str, bool]]:
     """
-    Extract candidate image URLs from a Bing Images HTML page.
+    Yield (url, trusted) candidate image URLs from a Bing Images HTML page,
+    in page order and without duplicates. `trusted` is True when Bing's 'm'
+    metadata carries both "turl" and "murl" (a curated result).
     Strategy:
     - Prefer anchors <a class="iusc"> that carry a JSON-ish "m" attribute with "murl".
     - Fallback: <img> tags with http(s) src or data-src that looks like an image.
-    Return a list of candidate URLs in the order they appear.
+    Being a generator, a caller that stops at the first live URL never pays
+    for decoding the remaining anchors or for the <img> fallback scan.
     """
-    soup = BeautifulSoup(html, "lxml")
-    candidates: List[str] = []
+    tree = LexborHTMLParser(html)
+    seen = set()
 
     # Primary: anchors with class iusc (metadata in 'm' attribute)
-    for a in soup.select("a.iusc"):
-        m_attr = a.get("m")
+    for a in tree.css("a.iusc"):
+        m_attr = a.attributes.get("m")
         if not m_attr:
             continue
+        url = None
+        trusted = False
         # 'm' is JSON-like; try to parse
         try:
-            data = json.loads(m_attr)
+            data = orjson.loads(m_attr)
             url = data.get("murl")
-            if url and url.startswith("http"):
-                candidates.append(url)
-        except Exception:
-            # sometimes it's just a string; do a naive extraction
-            key = '"murl":"'
-            m = m_attr
-            if key in m:
-                start = m.find(key) + len(key)
-                end = m.find('"', start)
-                if start > -1 and end > start:
-                    url = m[start:end]
-                    if url.startswith("http"):
-                        candidates.append(url)
+            trusted = bool(url and data.get("turl"))
+        except (orjson.JSONDecodeError, AttributeError):
+            # sometimes it's just a string; pull "murl" out with a regex
+            match = MURL_RE.search(m_attr)
+            if match:
+                url = match.group(1)
+        if url and url.startswith("http") and url not in seen:
+            seen.add(url)
+            yield url, trusted
 
     # Fallback: any <img> with a plausible URL
-    for img in soup.select("img"):
-        src = img.get("data-src") or img.get("src") or ""
+    for img in tree.css("img"):
+        src = img.attributes.get("data-src") or img.attributes.get("src") or ""
         if src.startswith("http") and any(ext in src.lower() for ext in [".jpg", ".jpeg", ".png", ".webp"]):
-            candidates.append(src)
-
-    # De-duplicate while preserving order
-    seen = set()
-    unique = []
-    for u in candidates:
-        if u in seen:
-            continue
-        seen.add(u)
-        unique.append(u)
-    return unique
+            if src not in seen:
+                seen.add(src)
+                yield src, False
 
 
-def bing_first_live_image(query: str) -> Optional[str]:
+async def bing_first_live_image(session: aiohttp.ClientSession, limiters: Dict[str, AsyncLimiter],
+                                query: str) -> Optional[str]:
     """
     Query Bing Images (page 1, then 2 if needed) and return the first
     URL that:
       - matches ALLOWED_DOMAINS (if configured),
       - and responds OK to a HEAD request.
+    All pages are requested at once and then used in order, so page 2 is
+    already downloaded if page 1 has nothing live; leftovers are cancelled.
     """
     q = urllib.parse.quote_plus(query)
+    pages = [
+        asyncio.ensure_future(http_get(
+            session, limiters, f"https://www.bing.com/images/search?q={q}&form=HDRSC2&first={first}&mkt=en-US"))
+        for first in BING_PAGES_FIRST_PARAMS
+    ]
+    try:
+        for page in pages:
+            live = await first_live_on_page(session, await page)
+            if live:
+                return live
+    finally:
+        for page in pages:
+            page.cancel()
 
-    for first in BING_PAGES_FIRST_PARAMS:
-        url = f"https://www.bing.com/images/search?q={q}&form=HDRSC2&first={first}&mkt=en-US"
-        try:
-            r = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            r.raise_for_status()
-        except Exception:
-            continue
+    return None
 
-        for candidate in parse_bing_image_results(r.text):
-            if not domain_is_allowed(candidate):
-                continue
-            if head_ok(candidate, timeout=10):
-                return candidate
 
-        # brief pause before trying next page
-        time.sleep(0.3)
+async def first_live_on_page(session: aiohttp.ClientSession, html: Optional[str]) -> Optional[str]:
+    """Return the first allowed, live image URL from one Bing results page."""
+    if html is None:
+        return None
 
-    return None
+    candidates = ((u, t) for u, t in iter_bing_candidates(html) if domain_is_allowed(u))
 
+    # Trust Bing's curated results: HEAD only the first trusted candidate among
+    # the first HEAD_BATCH, and fall back to probing the others if there is none
+    # or it turns out to be dead. The rest of the page stays undecoded until the
+    # fallback probing actually gets that far.
+    first = list(islice(candidates, HEAD_BATCH))
+    trusted = next((u for u, t in first if t), None)
+    if trusted and await head_ok(session, trusted, timeout=10):
+        return trusted
 
-def ensure_headers(ws, headers_needed: List[str]) -> Dict[str, int]:
+    untried = (u for u, _ in first if u != trusted)
+    return await first_live_url(session, chain(untried, (u for u, _ in candidates)))
+
+
+def iter_sheet_rows(cal: CalamineWorkbook, name: str) -> Iterator[list]:
+    """
+    Stream one sheet's rows as lists, aligned to column A (calamine starts
+    each row at the first used column).
+    """
+    sheet = cal.get_sheet_by_name(name)
+    pad = [""] * (sheet.start[1] if sheet.start else 0)
+    for values in sheet.iter_rows():
+        yield pad + values if pad else values
+
+
+def ensure_headers(header: list, headers_needed: List[str]) -> Dict[str, int]:
     """
     Ensure required headers exist in row 1. If missing, create them.
     Return a mapping {header_name: column_index}.
+    `header` is the sheet's first row; missing headers are appended to it.
     """
-    header_row = 1
     existing = {}
-    max_col = ws.max_column or 1
 
     # read existing headers
-    for col in range(1, max_col + 1):
-        val = ws.cell(row=header_row, column=col).value
+    for col, val in enumerate(header, start=1):
         if isinstance(val, str) and val.strip():
             existing[val.strip()] = col
 
     # add missing headers to the right
     for h in headers_needed:
         if h not in existing:
-            max_col += 1
-            ws.cell(row=header_row, column=max_col, value=h)
-            existing[h] = max_col
+            header.append(h)
+            existing[h] = len(header)
 
     return existing
 
 
+def write_workbook(src: str, headers: Dict[str, list], image_cols: Dict[str, int],
+                   found: Dict[Tuple[str, int], str], path: str) -> None:
+    """
+    Stream-copy every sheet of `src` into a new write-only workbook (values
+    only), replacing row 1 with the ensured `headers` and putting each found
+    URL {(sheet, row): url} into that sheet's Image column. Rows are read and
+    written one at a time, so the input is never held in memory as a whole.
+    """
+    cal = CalamineWorkbook.from_path(src)
+    wb = Workbook(write_only=True)
+    for name, header in headers.items():
+        ws = wb.create_sheet(title=name)
+        ws.append([None if v == "" else v for v in header])
+        width = len(header)
+        image_idx = image_cols[name] - 1
+        rows = iter_sheet_rows(cal, name)
+        next(rows, None)  # original header row
+        for row, values in enumerate(rows, start=2):
+            # calamine reports empty cells as ""; keep them empty in the output
+            out = [None if v == "" else v for v in values]
+            if len(out) < width:
+                out.extend([None] * (width - len(out)))
+            url = found.get((name, row))
+            if url:
+                out[image_idx] = url
+            ws.append(out)
+    wb.save(path)
+
+
+def save_progress(src: str, headers: Dict[str, list], image_cols: Dict[str, int],
+                  found: Dict[Tuple[str, int], str]) -> None:
+    """Write the output to a temp file, then atomically move it over OUTPUT_XLSX."""
+    tmp = OUTPUT_XLSX + ".tmp"
+    write_workbook(src, headers, image_cols, found, tmp)
+    os.replace(tmp, OUTPUT_XLSX)
+
+
+async def fill_images(work: List[Tuple[str, int, str]],
+                      on_result: Callable[[Tuple[str, int, str], Optional[str]], Awaitable[None]],
+                      workers: int = 1) -> None:
+    """
+    Search all queued (sheet, row, query) items concurrently, awaiting
+    on_result(item, chosen_url) as each one finishes. At most CONCURRENCY rows
+    are in flight at once; politeness towards Bing is handled by the per-host
+    limiters in http_get, which get 1/`workers` of the budget each.
+    """
+    sem = asyncio.Semaphore(CONCURRENCY)
+    # Limiters belong to one event loop, so each call gets fresh ones
+    limiters = make_host_limiters(workers)
+    connector = aiohttp.TCPConnector(limit=CONNECTIONS_LIMIT, limit_per_host=CONNECTIONS_PER_HOST,
+                                     keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL)
+
+    cache = SQLiteBackend(cache_name=HTTP_CACHE, expire_after=HTTP_CACHE_TTL,
+                          allowed_methods=("GET", "HEAD"))
+
+    async with CachedSession(cache=cache, connector=connector, headers=HEADERS) as session:
+
+        async def bounded(item: Tuple[str, int, str]) -> None:
+            sheet, row, query = item
+            async with sem:
+                print(f"- [{sheet} R{row}] Bing image search: {query!r}")
+                chosen = await bing_first_live_image(session, limiters, query)
+            await on_result(item, chosen)
+
+        await asyncio.gather(*[bounded(item) for item in work])
+
+
+def process_shard(shard: List[Tuple[str, int, str]], workers: int, results: queue.Queue) -> None:
+    """
+    Worker entry point: search one shard of rows, putting each (item, url)
+    on the `results` queue (a Manager queue) as soon as it is found.
+    `workers` is the number of processes sharing the per-host rate budget.
+    """
+    async def send(item: Tuple[str, int, str], chosen: Optional[str]) -> None:
+        # put() is a round trip to the manager process; keep it off the loop
+        await asyncio.to_thread(results.put, (item, chosen))
+
+    asyncio.run(fill_images(shard, send, workers))
+
+
 def main():
-    if not os.path.exists(INPUT_XLSX):
+    # Resume from a previous (partial) run if its output is there
+    src = OUTPUT_XLSX if os.path.exists(OUTPUT_XLSX) else INPUT_XLSX
+    if not os.path.exists(src):
         print(f"[!] Input workbook not found: {INPUT_XLSX}")
         return
+    if src == OUTPUT_XLSX:
+        print(f"Resuming from {OUTPUT_XLSX} (delete it to start over from {INPUT_XLSX})")
 
-    wb = load_workbook(INPUT_XLSX)
+    cal = CalamineWorkbook.from_path(src)
     total_filled = 0
     total_skipped = 0
 
-    for ws in wb.worksheets:
-        col_map = ensure_headers(ws, [TITLE_HEADER, IMAGE_HEADER])
+    # 1) Collect every row that needs an image, across all sheets
+    work: List[Tuple[str, int, str]] = []
+    headers: Dict[str, list] = {}
+    image_cols: Dict[str, int] = {}
+    skipped: Dict[str, int] = {}
+
+    for name in cal.sheet_names:
+        rows = iter_sheet_rows(cal, name)
+        header = next(rows, [])
+        col_map = ensure_headers(header, [TITLE_HEADER, IMAGE_HEADER])
+        headers[name] = header
+        width = len(header)
         title_col = col_map[TITLE_HEADER]
         image_col = col_map[IMAGE_HEADER]
+        image_cols[name] = image_col
+        skipped[name] = 0
 
-        # also keep indices for optional query columns
-        col_index_by_name = dict(col_map)
-
-        rows = ws.max_row
-        filled = 0
-        skipped = 0
+        # resolve optional query columns once per sheet
+        opt_idx = [col_map[c] for c in OPTIONAL_QUERY_COLUMNS if c in col_map]
 
-        print(f"\nSheet: {ws.title} — rows: {rows-1}")
-        print(f"Filling '{IMAGE_HEADER}' from '{TITLE_HEADER}' using Bing Images...")
-
-        for row in range(2, rows + 1):
-            title_val = ws.cell(row=row, column=title_col).value
+        row = 1
+        for row, values in enumerate(rows, start=2):
+            # pad rows when a header was added to the right
+            if len(values) < width:
+                values = values + [""] * (width - len(values))
+            title_val = values[title_col - 1]
 
             # skip empty titles
             if not title_val or not str(title_val).strip():
-                skipped += 1
+                skipped[name] += 1
                 continue
 
             # skip if already has an image
-            existing = ws.cell(row=row, column=image_col).value
+            existing = values[image_col - 1]
             if existing and str(existing).strip():
                 continue
 
-            query = build_query(str(title_val), ws, row, col_index_by_name)
-            print(f"- [{ws.title} R{row}] Bing image search: {query!r}")
-
-            url = bing_first_live_image(query)
-
-            if url:
-                ws.cell(row=row, column=image_col, value=url)
-                filled += 1
-            else:
-                print("  (no image found)")
-            time.sleep(DELAY_BETWEEN_QUERIES)
-
-        print(f"Sheet '{ws.title}': filled {filled}, skipped {skipped}")
-        total_filled += filled
-        total_skipped += skipped
-
-    wb.save(OUTPUT_XLSX)
+            work.append((name, row, build_query(str(title_val), values, opt_idx)))
+
+        print(f"\nSheet: {name} — rows: {row-1}")
+
+    # 2) Search each distinct query once (case-insensitive), in shards of
+    #    SHARD_ROWS spread over the worker processes
+    by_query: Dict[str, List[Tuple[str, int, str]]] = defaultdict(list)
+    for item in work:
+        by_query[item[2].lower()].append(item)
+    unique = [items[0] for items in by_query.values()]
+    shards = [unique[i:i + SHARD_ROWS] for i in range(0, len(unique), SHARD_ROWS)]
+
+    print(f"\nFilling '{IMAGE_HEADER}' from '{TITLE_HEADER}' for {len(work)} rows "
+          f"({len(unique)} unique queries) using Bing Images...")
+
+    # 3) Collect results as the workers find them; they are merged into the
+    #    rows when the output is written, with a checkpoint every SAVE_EVERY
+    #    filled rows. A shard that fails is reported; the rows it had already
+    #    found still count, the rest of it is skipped.
+    found: Dict[Tuple[str, int], str] = {}
+    filled = {name: 0 for name in headers}
+    filled_since_save = 0
+    checkpointed = False
+    if shards:
+        workers = min(WORKERS, len(shards))
+        with Manager() as manager, ProcessPoolExecutor(max_workers=workers) as pool:
+            results = manager.Queue()
+            futures = {pool.submit(process_shard, shard, workers, results): shard for shard in shards}
+            pending = set(futures)
+            # A worker's put() returns only once the item is queued, so by the
+            # time its shard is done, all of that shard's results are queued
+            while pending or not results.empty():
+                try:
+                    item, url = results.get(timeout=0.5)
+                except queue.Empty:
+                    for fut in [f for f in pending if f.done()]:
+                        pending.discard(fut)
+                        if fut.exception():
+                            print(f"  [!] A shard of {len(futures[fut])} queries failed; "
+                                  f"its remaining rows were skipped: {fut.exception()!r}")
+                    continue
+
+                for sheet, row, _ in by_query[item[2].lower()]:
+                    if url:
+                        found[(sheet, row)] = url
+                        filled[sheet] += 1
+                        filled_since_save += 1
+                    else:
+                        print(f"  [{sheet} R{row}] (no image found)")
+
+                if filled_since_save >= SAVE_EVERY:
+                    save_progress(src, headers, image_cols, found)
+                    filled_since_save = 0
+                    checkpointed = True
+
+    for name in headers:
+        print(f"Sheet '{name}': filled {filled[name]}, skipped {skipped[name]}")
+        total_filled += filled[name]
+        total_skipped += skipped[name]
+
+    # The last checkpoint is already up to date if nothing was filled since
+    if filled_since_save or not checkpointed:
+        save_progress(src, headers, image_cols, found)
     print("\nAll done.")
     print(f"Total filled:  {total_filled}")
     print(f"Total skipped: {total_skipped}")
@@ -9,7 +9,9 @@ WHAT THIS DOES
 - On every sheet, it looks for a column named "Title" (product title).
 - It queries the Google Custom Search JSON API (CSE) in **image** mode.
 - When it finds a result, it writes the image URL into the "Image" column.
-- Saves a new workbook with the Image column filled.
+- Rows are searched concurrently (see CONCURRENCY) over one shared HTTP session.
+- Saves a new workbook with the Image column filled (cell values only;
+  formatting from the input workbook is not copied).
 
 WHY GOOGLE CSE?
 ---------------
@@ -24,7 +26,7 @@ REQUIREMENTS (one-time)
 
    python3 -m venv ~/woo-import-images/.venv
    source ~/woo-import-images/.venv/bin/activate
-   pip install openpyxl requests
+   pip install openpyxl python-calamine aiohttp aiohttp-client-cache[sqlite] aiolimiter
 
 2) Google API key + Custom Search Engine:
    - Create API key: https://console.cloud.google.com/apis/credentials
@@ -65,23 +67,39 @@ NOTES
   * De-duplicates words in the query (so "India India Global" => "India Global").
   * Optionally uses extra columns (Brand, Region) to improve matches.
   * Skips rows where Image already exists.
+  * Searches each distinct query only once, even if many rows share it.
+  * Saves progress every SAVE_EVERY filled rows; if the output workbook already
+    exists, a re-run resumes from it and only searches the rows still empty.
   * HEAD-checks the chosen URL before writing it (avoid dead links).
+  * Caches API responses and HEAD checks on disk (HTTP_CACHE), so re-running
+    within HTTP_CACHE_TTL does not spend quota on the same queries again.
 """
 
 import os
-import time
+import json
+import asyncio
 import argparse
 from pathlib import Path
-from typing import Optional, Dict, List
+from urllib.parse import urlparse
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional, Dict, Iterator, List, Tuple
 
-import requests
-from openpyxl import load_workbook
+import aiohttp
+from aiolimiter import AsyncLimiter
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+from openpyxl import Workbook
+from python_calamine import CalamineWorkbook
 
 # ====================== USER CONFIG (EDIT THESE) ======================
 
 INPUT_XLSX  = "products_for_auto_images_ALL_SHEETS.xlsx"
 OUTPUT_XLSX = "products_with_images_ALL_SHEETS_GOOGLE.xlsx"
 
+# Progress is saved to OUTPUT_XLSX after every SAVE_EVERY filled rows. If
+# OUTPUT_XLSX already exists when the script starts, it is read instead of
+# INPUT_XLSX, so a re-run only searches the rows that are still empty.
+SAVE_EVERY = 50
+
 TITLE_HEADER = "Title"     # Column to read the product title / main query
 IMAGE_HEADER = "Image"     # Column to write the found image URL
 
@@ -89,15 +107,46 @@ IMAGE_HEADER = "Image"     # Column to write the found image URL
 OPTIONAL_QUERY_COLUMNS = ["Brand", "Region"]
 
 REQUEST_TIMEOUT = 20       # seconds for HTTP requests
-DELAY_BETWEEN_QUERIES = 0.45  # seconds; small delay to be polite
+HOST_RATE_LIMIT = 100      # API requests per host ...
+HOST_RATE_PERIOD = 60.0    # ... per this many seconds (CSE allows ~100/min)
 GOOGLE_ENDPOINT = "https://www.googleapis.com/customsearch/v1"
 
 SAFE = "active"            # 'active'|'off' — safe search setting
 IMG_SIZE = "large"         # 'icon','small','medium','large','xlarge','xxlarge','huge'
 RESULTS_PER_QUERY = 10     # up to 10 per API call; we’ll pick the first live one
 
+# How many rows are searched at the same time, and how big the connection pool is.
+CONCURRENCY = 64
+CONNECTIONS_LIMIT = 128
+CONNECTIONS_PER_HOST = 16
+KEEPALIVE_TIMEOUT = 60         # seconds an idle connection is kept for reuse
+DNS_CACHE_TTL = 300            # seconds a resolved host name is reused
+
+# Candidate image URLs HEAD-checked at the same time for one row
+HEAD_BATCH = 8
+
+# Retries for search requests that fail with a connection error or one of
+# RETRY_STATUSES; waits RETRY_BACKOFF * 2**n seconds before retry n+1
+# (or as long as a 429 response's Retry-After header asks).
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# On-disk cache for search pages and HEAD checks (SQLite file next to the script).
+# Keys include the full URL and query params, except the API key (so changing
+# keys keeps the cache valid). Delete the file to start fresh.
+HTTP_CACHE = ".woo_img_cache"
+HTTP_CACHE_TTL = 86400         # seconds (1 day)
+
 # ================== END OF USER CONFIG (USUALLY OK) ===================
 
+# One rate limiter per host, created on first use. Each allows one request
+# every HOST_RATE_PERIOD / HOST_RATE_LIMIT seconds: aiolimiter is a leaky
+# bucket, so AsyncLimiter(HOST_RATE_LIMIT, HOST_RATE_PERIOD) would let a whole
+# burst through first and then refill, about twice the limit in the first period.
+HOST_LIMITERS: Dict[str, AsyncLimiter] = defaultdict(
+    lambda: AsyncLimiter(1, HOST_RATE_PERIOD / HOST_RATE_LIMIT))
+
 
 # -------- Helpers to resolve credentials (key/cx) in multiple ways -----
 
@@ -152,18 +201,86 @@ def resolve_google_key_and_cx() -> (str, str):
 
 # ------------------------------ HTTP helpers ---------------------------
 
-def head_ok(url: str, timeout: int = 10) -> bool:
+async def cached_text(session: CachedSession, url: str, params: Optional[dict] = None) -> Optional[str]:
+    """Body of a still-valid cached GET response for `url` + `params`, or None if not cached."""
+    key = session.cache.create_key("GET", url, params=params)
+    response = await session.cache.get_response(key)
+    return None if response is None else await response.text()
+
+
+async def http_get(session: aiohttp.ClientSession, url: str, params: Optional[dict] = None) -> Optional[str]:
+    """
+    GET `url` on the shared session and return the body text, or None on failure.
+    Responses from the on-disk cache are returned straight away; only real
+    network requests first take a slot from their host's limiter.
+    Connection errors and RETRY_STATUSES are retried with exponential backoff
+    (honouring Retry-After); other HTTP errors give up straight away.
+    """
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    # A cached answer costs no network request, so it costs no rate-limit slot
+    text = await cached_text(session, url, params)
+    if text is not None:
+        return text
+
+    limiter = HOST_LIMITERS[urlparse(url).netloc.lower()]
+    delay = 0.0
+    for attempt in range(RETRY_TOTAL + 1):
+        if attempt:
+            await asyncio.sleep(delay)
+        delay = RETRY_BACKOFF * 2 ** attempt
+        try:
+            async with limiter:
+                async with session.get(url, params=params, timeout=timeout) as r:
+                    if r.status in RETRY_STATUSES:
+                        retry_after = r.headers.get("Retry-After", "")
+                        if r.status == 429 and retry_after.isdigit():
+                            delay = max(delay, float(retry_after))
+                        continue
+                    r.raise_for_status()
+                    return await r.text()
+        except aiohttp.ClientResponseError:
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            continue
+    return None
+
+
+async def head_ok(session: aiohttp.ClientSession, url: str, timeout: int = 10) -> bool:
     """Return True if URL responds 2xx/3xx; avoids storing dead links."""
     try:
-        r = requests.head(url, timeout=timeout, allow_redirects=True)
-        return 200 <= r.status_code < 400
+        async with session.head(url, timeout=aiohttp.ClientTimeout(total=timeout),
+                                allow_redirects=True) as r:
+            return 200 <= r.status < 400
     except Exception:
         return False
 
 
-def google_image_search(key: str, cx: str, query: str, num: int = RESULTS_PER_QUERY) -> List[str]:
+async def first_live_url(session: aiohttp.ClientSession, urls: List[str]) -> Optional[str]:
+    """
+    Return the first live URL among `urls`, probing HEAD_BATCH of them at a
+    time and taking whichever answers OK first. Leftover probes are cancelled.
     """
-    Query Google Custom Search JSON API in image mode and return a list of image URLs.
+    async def probe(url: str) -> Optional[str]:
+        return url if await head_ok(session, url, timeout=10) else None
+
+    for i in range(0, len(urls), HEAD_BATCH):
+        tasks = [asyncio.ensure_future(probe(u)) for u in urls[i:i + HEAD_BATCH]]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                url = await fut
+                if url:
+                    return url
+        finally:
+            for t in tasks:
+                t.cancel()
+    return None
+
+
+async def google_image_search(session: aiohttp.ClientSession, key: str, cx: str, query: str,
+                              num: int = RESULTS_PER_QUERY) -> List[Tuple[str, str, int]]:
+    """
+    Query Google Custom Search JSON API in image mode and return a list of
+    (image URL, mime type, byte size) tuples; mime/size are "" / 0 if missing.
     Docs: https://developers.google.com/custom-search/v1/reference/rest/v1/cse/list
     """
     params = {
@@ -175,54 +292,97 @@ def google_image_search(key: str, cx: str, query: str, num: int = RESULTS_PER_QU
         "imgSize": IMG_SIZE,
         "num": min(max(1, num), 10),  # Google allows up to 10 per request
     }
+    # Quota errors / 429 and server errors are retried with backoff in http_get
+    body = await http_get(session, GOOGLE_ENDPOINT, params=params)
+    if body is None:
+        return []
     try:
-        r = requests.get(GOOGLE_ENDPOINT, params=params, timeout=REQUEST_TIMEOUT)
-        # Simple handling for quota errors / 429 etc.
-        if r.status_code == 429:
-            # Too many requests — wait a bit more, user may need to add billing or slow down
-            time.sleep(2.0)
-            r = requests.get(GOOGLE_ENDPOINT, params=params, timeout=REQUEST_TIMEOUT)
-        r.raise_for_status()
-    except Exception:
+        data = json.loads(body)
+    except ValueError:
         return []
 
-    data = r.json()
     items = data.get("items", []) or []
-    urls = []
+    results = []
     for it in items:
         link = it.get("link")  # direct image URL
         if link:
-            urls.append(link)
-    return urls
+            image = it.get("image") or {}
+            results.append((link, it.get("mime") or "", int(image.get("byteSize") or 0)))
+    return results
 
 
 # -------------------------- Excel helpers ------------------------------
 
-def ensure_headers(ws, headers_needed: List[str]) -> Dict[str, int]:
+def iter_sheet_rows(cal: CalamineWorkbook, name: str) -> Iterator[list]:
+    """
+    Stream one sheet's rows as lists, aligned to column A (calamine starts
+    each row at the first used column).
+    """
+    sheet = cal.get_sheet_by_name(name)
+    pad = [""] * (sheet.start[1] if sheet.start else 0)
+    for values in sheet.iter_rows():
+        yield pad + values if pad else values
+
+
+def ensure_headers(header: list, headers_needed: List[str]) -> Dict[str, int]:
     """
     Ensure required headers exist in row 1. If a header is missing, create it.
     Return a mapping {header_name: column_index}.
+    `header` is the sheet's first row; missing headers are appended to it.
     """
-    header_row = 1
     existing = {}
-    max_col = ws.max_column or 1
 
     # read current headers
-    for col in range(1, max_col + 1):
-        val = ws.cell(row=header_row, column=col).value
+    for col, val in enumerate(header, start=1):
         if isinstance(val, str) and val.strip():
             existing[val.strip()] = col
 
     # add missing headers to the right
     for h in headers_needed:
         if h not in existing:
-            max_col += 1
-            ws.cell(row=header_row, column=max_col, value=h)
-            existing[h] = max_col
+            header.append(h)
+            existing[h] = len(header)
 
     return existing
 
 
+def write_workbook(src: str, headers: Dict[str, list], image_cols: Dict[str, int],
+                   found: Dict[Tuple[str, int], str], path: str) -> None:
+    """
+    Stream-copy every sheet of `src` into a new write-only workbook (values
+    only), replacing row 1 with the ensured `headers` and putting each found
+    URL {(sheet, row): url} into that sheet's Image column. Rows are read and
+    written one at a time, so the input is never held in memory as a whole.
+    """
+    cal = CalamineWorkbook.from_path(src)
+    wb = Workbook(write_only=True)
+    for name, header in headers.items():
+        ws = wb.create_sheet(title=name)
+        ws.append([None if v == "" else v for v in header])
+        width = len(header)
+        image_idx = image_cols[name] - 1
+        rows = iter_sheet_rows(cal, name)
+        next(rows, None)  # original header row
+        for row, values in enumerate(rows, start=2):
+            # calamine reports empty cells as ""; keep them empty in the output
+            out = [None if v == "" else v for v in values]
+            if len(out) < width:
+                out.extend([None] * (width - len(out)))
+            url = found.get((name, row))
+            if url:
+                out[image_idx] = url
+            ws.append(out)
+    wb.save(path)
+
+
+def save_progress(src: str, headers: Dict[str, list], image_cols: Dict[str, int],
+                  found: Dict[Tuple[str, int], str]) -> None:
+    """Write the output to a temp file, then atomically move it over OUTPUT_XLSX."""
+    tmp = OUTPUT_XLSX + ".tmp"
+    write_workbook(src, headers, image_cols, found, tmp)
+    os.replace(tmp, OUTPUT_XLSX)
+
+
 # ----------------------- Query building utilities ----------------------
 
 def dedupe_words(text: str) -> str:
@@ -230,31 +390,27 @@ def dedupe_words(text: str) -> str:
     Remove duplicate words while preserving order.
     E.g., "Aeropostale India India Global" -> "Aeropostale India Global"
     """
-    seen = set()
-    parts = []
+    # dicts keep insertion order, so the first spelling of each word wins
+    seen: Dict[str, str] = {}
     for w in text.split():
-        if w.lower() in seen:
-            continue
-        seen.add(w.lower())
-        parts.append(w)
-    return " ".join(parts)
+        seen.setdefault(w.lower(), w)
+    return " ".join(seen.values())
 
 
-def build_query(base_title: str, ws, row_idx: int, col_index_by_name: Dict[str, int]) -> str:
+def build_query(base_title: str, row_values: tuple, opt_idx: List[int]) -> str:
     """
     Construct a search query:
     - Start with Title.
-    - Append optional columns (Brand, Region) if present.
+    - Append optional columns (Brand, Region) if present; `opt_idx` holds their
+      1-based column numbers, resolved once per sheet.
     - De-duplicate words.
     You can customize this freely (e.g., append "gift card" or "prepaid voucher").
     """
     bits = [str(base_title).strip()]
-    for col_name in OPTIONAL_QUERY_COLUMNS:
-        idx = col_index_by_name.get(col_name)
-        if idx:
-            val = ws.cell(row=row_idx, column=idx).value
-            if val and str(val).strip():
-                bits.append(str(val).strip())
+    for idx in opt_idx:
+        val = row_values[idx - 1]
+        if val and str(val).strip():
+            bits.append(str(val).strip())
 
     # Optionally bias toward your domain:
     # bits.append("gift card")  # uncomment if helpful
@@ -265,71 +421,152 @@ def build_query(base_title: str, ws, row_idx: int, col_index_by_name: Dict[str,
 
 # --------------------------------- MAIN --------------------------------
 
+async def fill_images(key: str, cx: str, work: List[Tuple[str, int, str]],
+                      on_result: Callable[[Tuple[str, int, str], Optional[str]], Awaitable[None]]) -> None:
+    """
+    Search all queued rows concurrently, awaiting on_result(item, chosen_url)
+    as each one finishes. At most CONCURRENCY rows are in flight at once; the
+    API request rate is capped by the per-host limiter in http_get.
+    """
+    sem = asyncio.Semaphore(CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=CONNECTIONS_LIMIT, limit_per_host=CONNECTIONS_PER_HOST,
+                                     keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL)
+
+    cache = SQLiteBackend(cache_name=HTTP_CACHE, expire_after=HTTP_CACHE_TTL,
+                          allowed_methods=("GET", "HEAD"), ignored_params=["key"])
+
+    async with CachedSession(cache=cache, connector=connector) as session:
+
+        async def search(sheet: str, row: int, query: str) -> Optional[str]:
+            print(f"- [{sheet} R{row}] Google image search: {query!r}")
+
+            # Query Google CSE
+            candidates = await google_image_search(session, key, cx, query, num=RESULTS_PER_QUERY)
+            urls = [link for link, _, _ in candidates]
+
+            # Trust Google's metadata: HEAD only the first result that reports
+            # an image mime type and a size; probe the others if it is dead.
+            trusted = next((link for link, mime, size in candidates
+                            if mime.startswith("image/") and size > 0), None)
+            if trusted:
+                if await head_ok(session, trusted, timeout=10):
+                    return trusted
+                urls.remove(trusted)
+
+            return await first_live_url(session, urls)
+
+        async def bounded(item: Tuple[str, int, str]) -> None:
+            async with sem:
+                chosen = await search(*item)
+            await on_result(item, chosen)
+
+        await asyncio.gather(*[bounded(item) for item in work])
+
+
 def main():
-    if not os.path.exists(INPUT_XLSX):
+    # Resume from a previous (partial) run if its output is there
+    src = OUTPUT_XLSX if os.path.exists(OUTPUT_XLSX) else INPUT_XLSX
+    if not os.path.exists(src):
         print(f"[!] Input workbook not found: {INPUT_XLSX}")
         return
+    if src == OUTPUT_XLSX:
+        print(f"Resuming from {OUTPUT_XLSX} (delete it to start over from {INPUT_XLSX})")
 
     key, cx = resolve_google_key_and_cx()
 
-    wb = load_workbook(INPUT_XLSX)
+    cal = CalamineWorkbook.from_path(src)
     total_filled = 0
     total_skipped = 0
 
-    for ws in wb.worksheets:
-        col_map = ensure_headers(ws, [TITLE_HEADER, IMAGE_HEADER])
+    # Collect every row that needs an image, across all sheets
+    work: List[Tuple[str, int, str]] = []
+    headers: Dict[str, list] = {}
+    image_cols: Dict[str, int] = {}
+    skipped: Dict[str, int] = {}
+
+    for name in cal.sheet_names:
+        rows = iter_sheet_rows(cal, name)
+        header = next(rows, [])
+        col_map = ensure_headers(header, [TITLE_HEADER, IMAGE_HEADER])
+        headers[name] = header
+        width = len(header)
         title_col = col_map[TITLE_HEADER]
         image_col = col_map[IMAGE_HEADER]
+        image_cols[name] = image_col
+        skipped[name] = 0
 
-        # Keep a mapping we can also use to read optional columns
-        col_index_by_name = {k: v for k, v in col_map.items()}
-        rows = ws.max_row
-        filled = 0
-        skipped = 0
-
-        print(f"\nSheet: {ws.title} — rows: {rows-1}")
-        print(f"Filling '{IMAGE_HEADER}' from '{TITLE_HEADER}' using Google CSE...")
+        # Column numbers of the optional query columns present in this sheet
+        opt_idx = [col_map[c] for c in OPTIONAL_QUERY_COLUMNS if c in col_map]
 
-        for row in range(2, rows + 1):
-            title_val = ws.cell(row=row, column=title_col).value
+        row = 1
+        for row, values in enumerate(rows, start=2):
+            # pad rows when a header was added to the right
+            if len(values) < width:
+                values = values + [""] * (width - len(values))
+            title_val = values[title_col - 1]
 
             # 1) Skip rows without a title
             if not title_val or not str(title_val).strip():
-                skipped += 1
+                skipped[name] += 1
                 continue
 
             # 2) If Image already set, skip
-            existing_image = ws.cell(row=row, column=image_col).value
+            existing_image = values[image_col - 1]
             if existing_image and str(existing_image).strip():
                 continue
 
             # 3) Make query (Title + optional columns, deduped)
-            query = build_query(str(title_val), ws, row, col_index_by_name)
-            print(f"- [{ws.title} R{row}] Google image search: {query!r}")
-
-            # 4) Query Google CSE
-            candidates = google_image_search(key, cx, query, num=RESULTS_PER_QUERY)
-
-            # 5) Pick the first live URL
-            chosen = None
-            for url in candidates:
-                if head_ok(url, timeout=10):
-                    chosen = url
-                    break
-
+            work.append((name, row, build_query(str(title_val), values, opt_idx)))
+
+        print(f"\nSheet: {name} — rows: {row-1}")
+
+    # 4) Query Google CSE concurrently, once per distinct query (case-insensitive);
+    #    repeated titles would otherwise spend the daily quota again
+    by_query: Dict[str, List[Tuple[str, int, str]]] = defaultdict(list)
+    for item in work:
+        by_query[item[2].lower()].append(item)
+    unique = [items[0] for items in by_query.values()]
+
+    print(f"\nFilling '{IMAGE_HEADER}' from '{TITLE_HEADER}' for {len(work)} rows "
+          f"({len(unique)} unique queries) using Google CSE...")
+
+    # 5) Collect results as they arrive; they are merged into the rows when the
+    #    output is written, with a checkpoint every SAVE_EVERY filled rows
+    found: Dict[Tuple[str, int], str] = {}
+    filled = {name: 0 for name in headers}
+    filled_since_save = 0
+    checkpointed = False
+    save_lock = asyncio.Lock()
+
+    async def on_result(item: Tuple[str, int, str], chosen: Optional[str]) -> None:
+        nonlocal filled_since_save, checkpointed
+        for sheet, row, query in by_query[item[2].lower()]:
             if chosen:
-                ws.cell(row=row, column=image_col, value=chosen)
-                filled += 1
+                found[(sheet, row)] = chosen
+                filled[sheet] += 1
+                filled_since_save += 1
             else:
-                print("  (no live image found)")
-
-            time.sleep(DELAY_BETWEEN_QUERIES)
-
-        print(f"Sheet '{ws.title}': filled {filled}, skipped {skipped}")
-        total_filled += filled
-        total_skipped += skipped
-
-    wb.save(OUTPUT_XLSX)
+                print(f"  [{sheet} R{row}] (no live image found for {query!r})")
+
+        if filled_since_save >= SAVE_EVERY:
+            filled_since_save = 0
+            checkpointed = True
+            # Write the checkpoint in a thread so requests in flight keep going;
+            # the lock stops two checkpoints from writing the temp file at once
+            snapshot = dict(found)
+            async with save_lock:
+                await asyncio.to_thread(save_progress, src, headers, image_cols, snapshot)
+
+    asyncio.run(fill_images(key, cx, unique, on_result))
+
+    for name in headers:
+        print(f"Sheet '{name}': filled {filled[name]}, skipped {skipped[name]}")
+        total_filled += filled[name]
+        total_skipped += skipped[name]
+
+    # The last checkpoint is already up to date if nothing was filled since
+    if filled_since_save or not checkpointed:
+        save_progress(src, headers, image_cols, found)
     print("\nAll done.")
     print(f"Total filled:  {total_filled}")
     print(f"Total skipped: {total_skipped}")
@@ -9,7 +9,13 @@ WHAT THIS DOES
 - On every sheet, it looks for a column named "Title" (product title).
 - It makes a **Pixabay API** search (CC0-friendly images) for each missing image.
 - When it finds a result, it writes the image URL into the "Image" column.
+- Rows that share the same query (on any sheet) are looked up only once.
 - It saves a new workbook with the Image column filled.
+- The input is streamed with python-calamine and the output is written row
+  by row (xlsxwriter, constant-memory mode), so memory stays low even for
+  very large workbooks.
+  Only cell values are copied: formatting, column widths and formulas (their
+  last calculated values are kept) from the input workbook are not carried over.
 
 WHY PIXABAY?
 ------------
@@ -23,7 +29,7 @@ REQUIREMENTS (one-time)
 
    python3 -m venv ~/woo-import-images/.venv
    source ~/woo-import-images/.venv/bin/activate
-   pip install openpyxl requests
+   pip install python-calamine xlsxwriter aiohttp aiolimiter orjson
 
 2) Get a free Pixabay API key:
    https://pixabay.com/api/docs/
@@ -37,6 +43,9 @@ HOW TO RUN
     products_for_auto_images_ALL_SHEETS.xlsx
 - Run:
     python3 fill_images_in_xlsx_pixabay_multi.py
+- Titles that found no image are remembered for a while (see MISS_TTL_DAYS).
+  To search them again right away:
+    python3 fill_images_in_xlsx_pixabay_multi.py --refresh-misses
 
 OUTPUT
 ------
@@ -46,20 +55,41 @@ OUTPUT
 TROUBLESHOOTING
 ---------------
 - If you get "PIXABAY_API_KEY is not set", export it again in this terminal.
+- If you get "Pixabay rejected the API key", check the key on your Pixabay
+  account page; the script stops before reading the workbook.
 - If some products still have no images, Pixabay likely had no good match for
   that query. You can adjust the query building below to include Brand/Region.
 
 SAFE LIMITS / USAGE
 -------------------
-- The script delays between queries to respect API limits (see DELAY below).
-- It also does a HEAD request to confirm the image URL is alive before saving.
+- Lookups run concurrently (up to CONCURRENCY at a time) on one asyncio
+  event loop, but a rate limiter keeps the API calls within Pixabay's limit
+  (RATE_LIMIT per RATE_PERIOD seconds, spaced out evenly). A rate-limited
+  call waits as long as Pixabay asks before it is retried.
+- Lookups that still fail are reported as failed, not as "no image found",
+  and are retried on a later run (see TRANSIENT_TTL, or --refresh-misses).
+- Image URLs returned by the Pixabay API are trusted as-is. To HEAD-check
+  them before saving, set:
+    export PIXABAY_VERIFY_URLS=1
+  The first VERIFY_CANDIDATES URLs of every query are then checked in one
+  concurrent pass (HEAD_CONCURRENCY at a time) after all searches are done.
 """
 
 import os
+import re
+import sys
 import time
-import requests
-from typing import Optional
-from openpyxl import load_workbook
+import argparse
+import shelve
+import asyncio
+import hashlib
+from collections import defaultdict
+from typing import Iterator, Optional
+import aiohttp
+import orjson
+import xlsxwriter
+from aiolimiter import AsyncLimiter
+from python_calamine import CalamineWorkbook
 
 # ====================== USER CONFIG (EDIT THESE) ======================
 
@@ -75,12 +105,36 @@ IMAGE_HEADER = "Image"   # Where we write the found image URL
 
 # Networking / throttling:
 REQUEST_TIMEOUT = 20     # Seconds to wait for each web request
-DELAY_BETWEEN_QUERIES = 0.6   # Small delay (seconds) between API calls
+CONCURRENCY = 8          # Lookups in flight at the same time
+CONNECTIONS_LIMIT = 32   # Size of the HTTP connection pool
+DNS_CACHE_TTL = 300      # Seconds a resolved host name is reused
+RATE_LIMIT = 100         # Pixabay allows 100 API calls ...
+RATE_PERIOD = 60.0       # ... per 60 seconds
+HEAD_CONCURRENCY = 16    # URL checks in flight at the same time (PIXABAY_VERIFY_URLS)
+VERIFY_CANDIDATES = 5    # URLs per query that are checked (PIXABAY_VERIFY_URLS)
+
+# Retries for API calls that fail with a connection error or one of
+# RETRY_STATUSES; waits RETRY_BACKOFF * 2**n seconds before retry n+1
+# (or as long as a 429 response's Retry-After / X-RateLimit-Reset header asks).
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 # Search preferences for Pixabay
 MIN_WIDTH  = 600            # prefer medium+ images
 MIN_HEIGHT = 600
 SAFESEARCH = "true"         # "true" or "false"
+ORIENTATION = "horizontal"  # "all", "horizontal" or "vertical"
+
+# Pixabay responses are cached on disk so re-runs (and repeated titles) don't
+# spend API calls again; titles whose words all appear in the tags of a cached
+# image (fetched with the same search settings) reuse that image too. Misses ("no image") expire after MISS_TTL_DAYS
+# so new Pixabay uploads can still be found; failed requests (network errors,
+# rate limiting) are only remembered for TRANSIENT_TTL seconds. Delete the
+# cache file to start fresh, or run with --refresh-misses to retry all misses.
+CACHE_FILE = "pixabay_cache.db"
+MISS_TTL_DAYS = 7
+TRANSIENT_TTL = 3600
 
 # If your sheet also has other columns, you can use them to build a richer query.
 # Example: include "Brand" or "Region" to help the search.
@@ -91,37 +145,53 @@ OPTIONAL_QUERY_COLUMNS = ["Brand", "Region"]
 
 # Read API key from environment variable; this is safer than hard-coding it.
 API_KEY = os.getenv("PIXABAY_API_KEY", "").strip()
+
+# Pixabay's own URLs are authoritative, so the HEAD check is opt-in.
+VERIFY_URLS = os.getenv("PIXABAY_VERIFY_URLS", "").strip().lower() in ("1", "true", "yes")
 API_URL = "https://pixabay.com/api/"
 
+HEADERS = {"User-Agent": "woo-import-images/1.0", "Accept-Encoding": "gzip"}
+
+# One API call every RATE_PERIOD / RATE_LIMIT seconds. aiolimiter is a leaky
+# bucket: AsyncLimiter(RATE_LIMIT, RATE_PERIOD) would let a whole burst of
+# RATE_LIMIT calls through first and then refill, about twice the quota in
+# the first window.
+LIMITER = AsyncLimiter(1, RATE_PERIOD / RATE_LIMIT)
+
+# Used by normalize(): punctuation Pixabay's search does not use, and whitespace runs
+_PUNCT_RE = re.compile(r"[^\w\s-]", re.UNICODE)
+_WS_RE = re.compile(r"\s+")
+
 
-def head_ok(url: str, timeout: int = 10) -> bool:
+async def head_ok(session: aiohttp.ClientSession, url: str, timeout: int = 10) -> bool:
     """
     Quick check that the URL responds with a 2xx or 3xx code before we save it.
     This avoids storing dead links in your Excel.
     """
     try:
-        r = requests.head(url, timeout=timeout, allow_redirects=True)
-        return 200 <= r.status_code < 400
+        async with session.head(url, timeout=aiohttp.ClientTimeout(total=timeout),
+                                allow_redirects=True) as r:
+            return 200 <= r.status < 400
     except Exception:
         return False
 
 
-def build_query(base_title: str, ws, row_idx: int, col_index_by_name: dict) -> str:
+def normalize(s: str) -> str:
+    """
+    Canonical form of a query: punctuation removed, whitespace collapsed,
+    lower-case. "Brand X!" and "brand  x" both become "brand x".
+    """
+    return _WS_RE.sub(" ", _PUNCT_RE.sub(" ", s)).strip().lower()
+
+
+def build_query(base_title: str, extras: list[str]) -> str:
     """
     Build a search query for Pixabay. Start with the Title, and optionally
-    add more context (e.g., Brand/Region) if those columns exist.
+    add more context (e.g., the row's non-empty Brand/Region values).
 
     You can customize this function freely to improve matching.
     """
-    parts = [base_title.strip()]
-
-    # If Brand/Region columns exist, append them
-    for col_name in OPTIONAL_QUERY_COLUMNS:
-        col_idx = col_index_by_name.get(col_name)
-        if col_idx:
-            val = ws.cell(row=row_idx, column=col_idx).value
-            if val and str(val).strip():
-                parts.append(str(val).strip())
+    parts = [base_title.strip(), *extras]
 
     # Example: add a generic word like "gift card" if you want to bias results
     # parts.append("gift card")
@@ -130,148 +200,450 @@ def build_query(base_title: str, ws, row_idx: int, col_index_by_name: dict) -> s
     return " ".join(parts)
 
 
-def pixabay_first_image_url(query: str) -> Optional[str]:
+async def api_get(session: aiohttp.ClientSession, params: dict) -> Optional[bytes]:
+    """
+    Call the Pixabay API and return the raw response body, or None on failure.
+    Each attempt first takes a slot from the rate limiter, so only real API
+    calls count against it. Connection errors and RETRY_STATUSES are retried
+    with exponential backoff (on a 429, at least as long as Retry-After or
+    X-RateLimit-Reset asks); other HTTP errors give up straight away.
     """
-    Query the Pixabay API for a given search phrase, and return the best image URL
-    (prefer largeImageURL, then webformatURL, then previewURL). Returns None if
-    nothing reasonable is found.
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    delay = 0.0
+    for attempt in range(RETRY_TOTAL + 1):
+        if attempt:
+            await asyncio.sleep(delay)
+        delay = RETRY_BACKOFF * 2 ** attempt
+        try:
+            async with LIMITER:
+                async with session.get(API_URL, params=params, timeout=timeout) as r:
+                    if r.status in RETRY_STATUSES:
+                        if r.status == 429:
+                            # Seconds until Pixabay's rate-limit window resets
+                            wait = r.headers.get("Retry-After") or r.headers.get("X-RateLimit-Reset", "")
+                            try:
+                                delay = max(delay, float(wait))
+                            except ValueError:
+                                pass
+                        continue
+                    r.raise_for_status()
+                    return await r.read()
+        except aiohttp.ClientResponseError:
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            continue
+    return None
 
-    Docs: https://pixabay.com/api/docs/
+
+async def pixabay_hits(session: aiohttp.ClientSession, query: str) -> Optional[list[dict]]:
     """
-    if not API_KEY:
-        # Fail fast with a clear message so the user knows what to do.
-        raise RuntimeError("PIXABAY_API_KEY is not set. Export it in your shell: "
-                           "export PIXABAY_API_KEY=YOUR_KEY_HERE")
+    Query the Pixabay API for a given search phrase and return its hits, trimmed
+    to what we keep: {"id", "url", "tags"}, where "url" is the best image URL
+    (largeImageURL, then webformatURL, then previewURL). Returns [] if nothing
+    reasonable is found, or None if the request itself failed.
 
+    Docs: https://pixabay.com/api/docs/
+    """
     params = {
         "key": API_KEY,
         "q": query,                 # the search string
         "image_type": "photo",      # photos only; you can use 'illustration' if needed
         "safesearch": SAFESEARCH,   # filter adult content
-        "per_page": 10,             # how many results to fetch per request
+        "per_page": 50,             # same quota cost as 10; the extra hits serve similar titles
         "page": 1,
         "lang": "en",               # language for searching
-        "orientation": "horizontal",
+        "orientation": ORIENTATION,
         "order": "popular",
         "min_width": MIN_WIDTH,
         "min_height": MIN_HEIGHT,
     }
 
+    body = await api_get(session, params)
+    if body is None:
+        return None
     try:
-        r = requests.get(API_URL, params=params, timeout=REQUEST_TIMEOUT)
-        r.raise_for_status()
-    except Exception:
+        # Parse the raw (gzip-decoded) bytes directly; no intermediate str
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
         return None
 
-    data = r.json()
-    hits = data.get("hits", [])
-    if not hits:
-        return None
+    hits = []
+    for h in data.get("hits", ()):
+        # Prefer the larger image when available.
+        url = h.get("largeImageURL") or h.get("webformatURL") or h.get("previewURL")
+        if url:
+            hits.append({"id": h.get("id"), "url": url, "tags": h.get("tags", "")})
+    return hits
+
+
+async def verify_urls_parallel(session: aiohttp.ClientSession, urls: set[str]) -> set[str]:
+    """HEAD-check all `urls` concurrently (HEAD_CONCURRENCY at a time) and return the live ones."""
+    sem = asyncio.Semaphore(HEAD_CONCURRENCY)
+
+    async def probe(url: str) -> Optional[str]:
+        async with sem:
+            return url if await head_ok(session, url, timeout=10) else None
+
+    return {url for url in await asyncio.gather(*[probe(u) for u in urls]) if url}
+
 
-    # Prefer the larger image when available. Verify the URL is alive.
+# Inverted tag index over every hit seen so far (tag word -> hit URLs), and
+# the order in which the URLs were first seen; see near_match()
+_TAG_INDEX: dict[str, set[str]] = defaultdict(set)
+_URL_ORDER: dict[str, int] = {}
+
+
+def search_settings() -> str:
+    """The search settings that affect a query's result, as one string."""
+    return "|".join([SAFESEARCH, ORIENTATION, str(MIN_WIDTH), str(MIN_HEIGHT)])
+
+
+def cache_key(norm: str) -> str:
+    """Stable cache key for a normalized query and the search settings that affect its result."""
+    raw = f"{norm}|{search_settings()}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def remember_hits(hits: list[dict]) -> None:
+    """Add hits to the tag index used by near_match()."""
     for h in hits:
-        candidate = h.get("largeImageURL") or h.get("webformatURL") or h.get("previewURL")
-        if not candidate:
-            continue
-        if head_ok(candidate, timeout=10):
-            return candidate
+        url = h["url"]
+        _URL_ORDER.setdefault(url, len(_URL_ORDER))
+        for word in h["tags"].lower().replace(",", " ").split():
+            _TAG_INDEX[word].add(url)
+
+
+def load_tag_index(db: shelve.Shelf) -> None:
+    """
+    Fill the tag index from the responses stored in the cache by earlier runs.
+    Only responses fetched with the current search settings are used, so
+    e.g. hits from a SAFESEARCH="false" run are never reused with "true".
+    """
+    settings = search_settings()
+    for entry in db.values():
+        if entry.get("settings") == settings:
+            remember_hits(entry.get("hits") or [])
 
-    return None
+
+def near_match(norm: str) -> list[str]:
+    """
+    Reuse images we already know about: the URLs of hits (from any earlier
+    response with the current search settings) whose tags contain every word of the normalized query `norm`.
+    No API call needed.
+    """
+    words = set(norm.split())
+    if not words:
+        # An empty word set is a subset of every hit's tags
+        return []
+
+    # Intersect the URL sets of all words, smallest first
+    url_sets = []
+    for word in words:
+        urls = _TAG_INDEX.get(word)
+        if not urls:
+            return []
+        url_sets.append(urls)
+    url_sets.sort(key=len)
+    matched = url_sets[0].intersection(*url_sets[1:])
+    return sorted(matched, key=_URL_ORDER.__getitem__)
+
+
+async def image_candidates(session: aiohttp.ClientSession, db: shelve.Shelf, norm: str,
+                           refresh_misses: bool = False) -> Optional[list[str]]:
+    """
+    Candidate image URLs for the normalized query `norm` (see normalize()),
+    best first, spending an API call only when needed:
+    1) the hits stored in the cache `db` for this exact query, if any;
+    2) a near match from hits already fetched for other queries;
+    3) a new Pixabay search, whose hits are then stored in the cache.
+    Stored hits are kept. "No image" entries are trusted for MISS_TTL_DAYS,
+    failed requests (tagged "transient") for TRANSIENT_TTL seconds; with
+    `refresh_misses` both are searched again. Returns None if the lookup
+    failed (now or within TRANSIENT_TTL), so it is not mistaken for a miss.
+    """
+    key = cache_key(norm)
+    entry = db.get(key)
+    if entry and "hits" in entry:
+        if entry["hits"]:
+            return [h["url"] for h in entry["hits"]]
+        ttl = TRANSIENT_TTL if entry.get("transient") else MISS_TTL_DAYS * 86400
+        if not refresh_misses and time.time() - entry["ts"] < ttl:
+            return None if entry.get("transient") else []
+
+    urls = near_match(norm)
+    if urls:
+        return urls
+
+    hits = await pixabay_hits(session, norm)
+    if hits is None:
+        db[key] = {"hits": [], "ts": time.time(), "transient": True}
+        return None
+    db[key] = {"hits": hits, "ts": time.time(), "settings": search_settings()}
+    remember_hits(hits)
+    return [h["url"] for h in hits]
 
 
-def ensure_headers(ws, headers_needed: list[str]) -> dict[str, int]:
+def iter_sheet_rows(cal: CalamineWorkbook, name: str) -> Iterator[list]:
+    """
+    Stream one sheet's rows as lists, aligned to column A (calamine starts
+    each row at the first used column).
+    """
+    sheet = cal.get_sheet_by_name(name)
+    pad = [""] * (sheet.start[1] if sheet.start else 0)
+    for values in sheet.iter_rows():
+        yield pad + values if pad else values
+
+
+def ensure_headers(header: list, headers_needed: list[str]) -> dict[str, int]:
     """
     Ensure required headers exist in row 1. If a header is missing, create it.
     Return a mapping {header_name: column_index} for easy access later.
+    `header` is the sheet's first row; missing headers are appended to it.
     """
-    header_row = 1
     existing = {}
-    max_col = ws.max_column or 1
 
     # Read current headers from row 1 (A1 -> first cell)
-    for col in range(1, max_col + 1):
-        val = ws.cell(row=header_row, column=col).value
+    for col, val in enumerate(header, start=1):
         if isinstance(val, str) and val.strip():
             existing[val.strip()] = col
 
     # Add any missing headers to the right
     for h in headers_needed:
         if h not in existing:
-            max_col += 1
-            ws.cell(row=header_row, column=max_col, value=h)
-            existing[h] = max_col
+            header.append(h)
+            existing[h] = len(header)
 
     return existing
 
 
-def main():
-    # Basic sanity check
-    if not os.path.exists(INPUT_XLSX):
-        print(f"[!] Input workbook not found: {INPUT_XLSX}")
-        return
-
-    # Load workbook once; we’ll iterate all sheets
-    wb = load_workbook(INPUT_XLSX)
+def read_phase(path: str):
+    """
+    Stream every sheet of the input once (values only, via calamine) and
+    collect what the rest of the run needs. Returns (headers, image_cols, pending, skipped):
+      headers:    {sheet: header row, with Title/Image added if missing}
+      image_cols: {sheet: column index of the Image column}
+      pending:    [(sheet, row, query)] for every row that needs an image
+      skipped:    {sheet: number of rows without a title}
+    """
+    cal = CalamineWorkbook.from_path(path)
+    headers = {}
+    image_cols = {}
+    pending = []
+    skipped = {}
 
-    total_filled = 0
-    total_skipped = 0
+    for name in cal.sheet_names:
+        rows = iter_sheet_rows(cal, name)
 
-    # Process every sheet in the workbook
-    for ws in wb.worksheets:
         # Make sure the two columns we depend on exist
-        col_map = ensure_headers(ws, [TITLE_HEADER, IMAGE_HEADER])
-
-        # Build a handy "name -> index" map we can also use for optional columns
-        col_index_by_name = {k: v for k, v in col_map.items()}
+        header = next(rows, [])
+        col_map = ensure_headers(header, [TITLE_HEADER, IMAGE_HEADER])
+        headers[name] = header
+        width = len(header)
 
         title_col = col_map[TITLE_HEADER]
         image_col = col_map[IMAGE_HEADER]
+        image_cols[name] = image_col
+        skipped[name] = 0
 
-        rows = ws.max_row
-        filled = 0
-        skipped = 0
+        # Resolve the optional query columns once per sheet
+        opt_idx = [col_map[c] - 1 for c in OPTIONAL_QUERY_COLUMNS if c in col_map]
 
-        print(f"\nSheet: {ws.title} — rows: {rows - 1}")
-        print(f"Filling '{IMAGE_HEADER}' from '{TITLE_HEADER}' using Pixabay...")
-
-        # Start from row 2 (row 1 is headers)
-        for row in range(2, rows + 1):
-            title_val = ws.cell(row=row, column=title_col).value
+        # Row 1 is headers, data starts at row 2
+        row = 1
+        for row, values in enumerate(rows, start=2):
+            # Pad short rows (e.g. when a header was added to the right)
+            if len(values) < width:
+                values = values + [""] * (width - len(values))
+            title_val = values[title_col - 1]
 
             # Skip rows that don’t have a title
             if not title_val or not str(title_val).strip():
-                skipped += 1
+                skipped[name] += 1
                 continue
 
             # If Image already has a value, don’t overwrite it
-            existing_image = ws.cell(row=row, column=image_col).value
+            existing_image = values[image_col - 1]
             if existing_image and str(existing_image).strip():
                 continue
 
             # Build a richer query string (Title + optional columns)
-            query = build_query(str(title_val), ws, row, col_index_by_name)
-            print(f"- [{ws.title} R{row}] Pixabay search: {query!r}")
+            extras = [v for v in (str(values[i]).strip() for i in opt_idx) if v]
+            query = build_query(str(title_val), extras)
+            pending.append((name, row, query))
+
+        print(f"\nSheet: {name} — rows: {row - 1}")
+
+    return headers, image_cols, pending, skipped
 
-            url = pixabay_first_image_url(query)
 
+def write_phase(path: str, headers: dict, image_cols: dict, found: dict) -> None:
+    """
+    Stream-copy every sheet of the input into a new workbook, replacing row 1
+    with the ensured headers and putting each found URL {(sheet, row): url}
+    into that sheet's Image column. In constant-memory mode xlsxwriter flushes
+    each row to disk before the next one is written.
+    """
+    cal = CalamineWorkbook.from_path(path)
+    wb = xlsxwriter.Workbook(OUTPUT_XLSX, {
+        "constant_memory": True,
+        "strings_to_urls": False,       # keep URLs as plain text cells
+        "strings_to_formulas": False,   # copy values as-is, even ones starting with "="
+        "default_date_format": "yyyy-mm-dd",
+    })
+
+    for name, header in headers.items():
+        ws = wb.add_worksheet(name)
+        ws.write_row(0, 0, header)
+        image_idx = image_cols[name] - 1
+
+        rows = iter_sheet_rows(cal, name)
+        next(rows, None)  # original header row
+        for row, values in enumerate(rows, start=2):
+            # Rows without a new URL are passed through unchanged; otherwise the
+            # URL goes into the row list (fresh from calamine) before the write.
+            url = found.get((name, row))
             if url:
-                ws.cell(row=row, column=image_col, value=url)
-                filled += 1
-            else:
-                print("  (no CC0 image found)")
+                if len(values) <= image_idx:
+                    values.extend([""] * (image_idx + 1 - len(values)))
+                values[image_idx] = url
+            # calamine reports empty cells as ""; xlsxwriter leaves those empty
+            ws.write_row(row - 1, 0, values)
+
+    wb.close()
+
+
+async def check_api_key() -> Optional[str]:
+    """
+    Make one small API call to see whether Pixabay accepts API_KEY. Returns
+    Pixabay's error message if the key is rejected, else None. Network
+    trouble is not treated as an error here; the real lookups retry anyway.
+    It runs on its own event loop, so fill_images() counts it against the
+    rate limiter instead.
+    """
+    params = {"key": API_KEY, "q": "test", "per_page": 3}
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    try:
+        async with aiohttp.ClientSession(headers=HEADERS) as session:
+            async with session.get(API_URL, params=params, timeout=timeout) as r:
+                # 429 only means we are rate limited; the key itself is fine
+                if 400 <= r.status < 500 and r.status != 429:
+                    return f"HTTP {r.status}: {(await r.text()).strip()}"
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+    return None
+
+
+async def fill_images(work: list[tuple[str, int, str, str]], refresh_misses: bool = False) -> list[Optional[str]]:
+    """
+    Look up all queued (sheet, row, query, normalized query) items concurrently and
+    return the found URLs in the same order as `work`: "" where Pixabay has
+    no image, None where the lookup failed. At most CONCURRENCY lookups are
+    in flight at a time.
+    `refresh_misses` re-searches queries cached as "no image".
+
+    Each query's URL is its first candidate. With VERIFY_URLS, the first
+    VERIFY_CANDIDATES candidates of all queries are HEAD-checked together
+    once the searches are done, and each query gets its first live one.
+    """
+    sem = asyncio.Semaphore(CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=CONNECTIONS_LIMIT, ttl_dns_cache=DNS_CACHE_TTL)
+
+    # main() has just made one API call in check_api_key(); count it too
+    await LIMITER.acquire()
+
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        with shelve.open(CACHE_FILE) as db:
+            load_tag_index(db)
+
+            async def bounded(sheet: str, row: int, query: str, norm: str) -> Optional[list[str]]:
+                async with sem:
+                    print(f"- [{sheet} R{row}] Pixabay search: {query!r}")
+                    return await image_candidates(session, db, norm, refresh_misses)
+
+            candidates = await asyncio.gather(*[bounded(*item) for item in work])
+
+        if not VERIFY_URLS:
+            return [None if urls is None else urls[0] if urls else "" for urls in candidates]
+
+        candidates = [None if urls is None else urls[:VERIFY_CANDIDATES] for urls in candidates]
+        live = await verify_urls_parallel(session, {url for urls in candidates if urls for url in urls})
+        return [None if urls is None else next((url for url in urls if url in live), "")
+                for urls in candidates]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the Image column of a workbook from Pixabay.")
+    parser.add_argument("--refresh-misses", action="store_true",
+                        help="search again for titles cached as 'no image found'")
+    args = parser.parse_args()
+
+    # Fail fast, before any workbook work, if the API key is missing or rejected
+    if not API_KEY:
+        sys.exit("PIXABAY_API_KEY is not set. Export it in your shell: "
+                 "export PIXABAY_API_KEY=YOUR_KEY_HERE")
+    error = asyncio.run(check_api_key())
+    if error:
+        sys.exit(f"[!] Pixabay rejected the API key ({error}). Check PIXABAY_API_KEY.")
+
+    # Basic sanity check
+    if not os.path.exists(INPUT_XLSX):
+        print(f"[!] Input workbook not found: {INPUT_XLSX}")
+        return
 
-            # Be polite to the API: a small pause between requests
-            time.sleep(DELAY_BETWEEN_QUERIES)
+    total_filled = 0
+    total_skipped = 0
+
+    # First pass: collect every (sheet, row, query) that needs an image
+    headers, image_cols, pending, skipped = read_phase(INPUT_XLSX)
+
+    # Second pass: group rows that share a query (after normalize(), across
+    # all sheets) and look each distinct query up once, concurrently. The rate
+    # limiter (taken right before each API call) keeps us within Pixabay's
+    # rate limit; results are merged into the rows when the output is written.
+    by_query = defaultdict(list)
+    searchable = 0
+    for sheet, row, query in pending:
+        norm = normalize(query)
+        # A title of only punctuation leaves nothing to search for
+        if not norm:
+            print(f"  [{sheet} R{row}] (nothing to search for in {query!r}, skipped)")
+            skipped[sheet] += 1
+            continue
+        by_query[norm].append((sheet, row, query))
+        searchable += 1
+    # Each distinct query is searched (and logged) as its first row's title
+    work = [(*items[0], norm) for norm, items in by_query.items()]
+
+    print(f"\nFilling '{IMAGE_HEADER}' from '{TITLE_HEADER}' for {searchable} rows "
+          f"({len(work)} unique queries) using Pixabay...")
+    found = {}
+    filled = {name: 0 for name in headers}
+    failed = 0
+
+    urls = asyncio.run(fill_images(work, args.refresh_misses))
+    for (*_, norm), url in zip(work, urls):
+        for sheet, row, query in by_query[norm]:
+            if url:
+                found[(sheet, row)] = url
+                filled[sheet] += 1
+            elif url is None:
+                print(f"  [{sheet} R{row}] (Pixabay lookup failed for {query!r})")
+                failed += 1
+            else:
+                print(f"  [{sheet} R{row}] (no CC0 image found for {query!r})")
 
-        print(f"Sheet '{ws.title}': filled {filled}, skipped {skipped}")
-        total_filled += filled
-        total_skipped += skipped
+    for name in headers:
+        print(f"Sheet '{name}': filled {filled[name]}, skipped {skipped[name]}")
+        total_filled += filled[name]
+        total_skipped += skipped[name]
 
-    # Save the new workbook with URLs filled in
-    wb.save(OUTPUT_XLSX)
+    # Third pass: write the new workbook with URLs filled in
+    write_phase(INPUT_XLSX, headers, image_cols, found)
     print("\nAll done.")
     print(f"Total filled:  {total_filled}")
     print(f"Total skipped: {total_skipped}")
+    if failed:
+        print(f"Lookup failed: {failed} (network or rate-limit errors; run again later to retry)")
     print(f"Saved as:      {OUTPUT_XLSX}")
 
 